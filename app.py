@@ -1,16 +1,50 @@
 #!/usr/bin/env python3
 import os
+import io
 import json
 import re
+import stat
+import string
 import subprocess
 import requests
 import threading
+import uuid
+import functools
+import hashlib
+import time
+from dataclasses import dataclass, asdict, replace
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+from collections import OrderedDict, deque
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from flask import Flask, render_template, request, jsonify
 from ytmusicapi import YTMusic
-from mutagen.easyid3 import EasyID3
-from mutagen.id3 import ID3, APIC, ID3NoHeaderError
+try:
+    from yt_dlp import YoutubeDL
+    from yt_dlp.utils import DownloadError, PostProcessingError
+except ImportError:
+    YoutubeDL = None
+try:
+    from diskcache import Cache
+except ImportError:
+    Cache = None
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+from mutagen.id3 import ID3, APIC, TALB, TIT2, TPE2, TRCK, TXXX, ID3NoHeaderError
 from mutagen.flac import FLAC, Picture
 import shutil
+import tempfile
 from urllib.parse import urlparse, parse_qs
 import secrets
 
@@ -29,50 +63,421 @@ else:
     BEETS_CONFIG = os.path.join(CONFIG_DIR, "config.yaml")
 
 COOKIES_FILE = "cookies.txt"
+TAG_POOL = os.environ.get("TAG_POOL", "thread")
+# Fragments fetched in parallel per track; YTDLP_CONCURRENCY is the older name
+YTDLP_N_FRAGS = os.environ.get("YTDLP_N_FRAGS") or os.environ.get("YTDLP_CONCURRENCY", "8")
+STDERR_TAIL_LINES = 200
+DEBUG_JSON = bool(os.environ.get("DEBUG_JSON"))
+# Local scratch space for downloads/tagging before the move to MUSIC_DIR
+# (which may be a NAS mount); None means the system temp dir.
+STAGING_DIR = os.environ.get("STAGING_DIR") or None
+
+# Shared HTTP session so album-art fetches reuse pooled connections
+_http = requests.Session()
+_http.mount('https://', HTTPAdapter(
+    pool_connections=8,
+    pool_maxsize=32,
+    max_retries=Retry(total=3, backoff_factor=0.3, status_forcelist=[429, 500, 502, 503, 504])
+))
+# (connect, read): fail fast on dead hosts, allow slow image transfers
+HTTP_TIMEOUT = (3.05, 27)
+_http.headers.update({'User-Agent': 'music-downloader/1.0'})
+
+ART_CACHE_DIR = os.path.join(CONFIG_DIR, "art_cache")
+# Longest side for embedded covers (e.g. 600); 0 keeps the original image
+ART_MAX_DIM = int(os.environ.get("ART_MAX_DIM", "0"))
+
+def _json_bytes(obj, indent=False, sort_keys=False):
+    """Serialize obj to UTF-8 JSON, using orjson when it is installed."""
+    if orjson is not None:
+        option = (orjson.OPT_INDENT_2 if indent else 0) | (orjson.OPT_SORT_KEYS if sort_keys else 0)
+        return orjson.dumps(obj, option=option)
+    return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys,
+                      indent=2 if indent else None,
+                      separators=None if indent else (",", ":")).encode("utf-8")
+
+def _json_response(obj):
+    return app.response_class(_json_bytes(obj), mimetype="application/json")
 
 # Ensure directories exist
 os.makedirs(MUSIC_DIR, exist_ok=True)
 os.makedirs(CONFIG_DIR, exist_ok=True)
+os.makedirs(ART_CACHE_DIR, exist_ok=True)
+
+# Precompiled patterns for filename/title cleanup
+_SANITIZE_TABLE = str.maketrans('', '', '\\/*?:"<>|')
+_NORMALIZE_RE = re.compile(r'\W+')
+# Same effect as _NORMALIZE_RE for printable ASCII, without the regex engine
+_NORMALIZE_TABLE = str.maketrans('', '', string.punctuation.replace('_', '') + string.whitespace)
+_LEAD_NUM_RE = re.compile(r"^\d+\s*[-.]?\s*")
+# (feat. ...), (Explicit)/[Explicit] and any other [...] tag, removed in one scan
+_CLEAN_RE = re.compile(r"\s*\(feat\..*?\)|\s*[\(\[]Explicit[\)\]]|\s*\[.*?\]", re.IGNORECASE)
 
 # Set proper permissions for Navidrome
+CHMOD_WORKERS = 16
+
+def _collect_chmods(root, targets):
+    """Append (path, mode) for every entry under root whose mode is wrong."""
+    # Explicit stack rather than recursion, so deep trees can't hit the recursion limit
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for e in it:
+                    # A link's own mode is always 0o777 and chmod would follow it
+                    if e.is_symlink():
+                        continue
+                    is_dir = e.is_dir(follow_symlinks=False)
+                    want = 0o755 if is_dir else 0o644
+                    if (e.stat(follow_symlinks=False).st_mode & 0o777) != want:
+                        targets.append((e.path, want))
+                    if is_dir:
+                        stack.append(e.path)
+        except OSError as e:
+            print(f"Warning: Could not scan {e.filename}: {e}")
+
 def set_file_permissions(path):
-    """Set proper permissions for music files."""
+    """Set proper permissions for music files, touching only entries that differ."""
+    if APP_ENV != "docker":
+        # Only the Docker/Navidrome deployment needs normalized modes
+        return
     try:
-        if os.path.isfile(path):
-            os.chmod(path, 0o644)
-        elif os.path.isdir(path):
-            os.chmod(path, 0o755)
-            for root, dirs, files in os.walk(path):
-                for d in dirs:
-                    os.chmod(os.path.join(root, d), 0o755)
-                for f in files:
-                    os.chmod(os.path.join(root, f), 0o644)
+        st_mode = os.stat(path).st_mode
+        is_dir = stat.S_ISDIR(st_mode)
+        want = 0o755 if is_dir else 0o644
+        targets = [(path, want)] if (st_mode & 0o777) != want else []
+        if is_dir:
+            _collect_chmods(path, targets)
+        if not targets:
+            return
+        # chmod is one round-trip each on NAS mounts; issue them concurrently
+        with ThreadPoolExecutor(max_workers=min(CHMOD_WORKERS, len(targets))) as ex:
+            list(ex.map(lambda t: os.chmod(*t), targets))
     except Exception as e:
         print(f"Warning: Could not set permissions: {e}")
 
 # Download status tracking
-download_status = {}
+MAX_TRACKED_DOWNLOADS = 512
+# Finished entries are forgotten after this long (seconds); clients poll until done
+STATUS_TTL = int(os.environ.get("STATUS_TTL", "1800"))
+STATUS_SWEEP_INTERVAL = 60
+
+
+@dataclass(frozen=True, slots=True)
+class DLStatus:
+    status: str
+    message: str
+    type: str
+
+
+# Entries are immutable snapshots replaced with a single dict store, so the
+# polling endpoint can read them without taking download_lock. The lock only
+# guards inserting/evicting ids.
+download_status = OrderedDict()
+_download_futures = {}
+_finished_at = {}
 download_lock = threading.Lock()
 
-def run_download_with_fallback(output_template, url, cookies=True, quality='flac'):
-    """Download audio with user-selected quality."""
+# Bounded worker pool so bursts of requests don't spawn unlimited yt-dlp processes
+_pool = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('MAX_CONCURRENT_DOWNLOADS') or os.environ.get('DL_WORKERS', '4')),
+    thread_name_prefix='dl'
+)
+
+def submit_download(download_id, fn):
+    """Queue a download task on the worker pool and remember its future."""
+    future = _pool.submit(fn)
+    _download_futures[download_id] = future
+    return future
+
+def _forget_download(download_id):
+    download_status.pop(download_id, None)
+    _download_futures.pop(download_id, None)
+    _finished_at.pop(download_id, None)
+
+def _gc_status():
+    """Drop finished downloads past STATUS_TTL, then the oldest beyond the cap.
+
+    Must be called with download_lock held. Running downloads are never
+    evicted, so their workers can keep publishing status.
+    """
+    cutoff = time.monotonic() - STATUS_TTL
+    # list() snapshots in one step; update_status adds entries without the lock
+    for old_id in [k for k, t in list(_finished_at.items()) if t < cutoff]:
+        _forget_download(old_id)
+    excess = len(download_status) - MAX_TRACKED_DOWNLOADS
+    if excess <= 0:
+        return
+    finished = [k for k, v in download_status.items() if v.status in ('completed', 'error')]
+    for old_id in finished[:excess]:
+        _forget_download(old_id)
+
+def _sweep_status_forever():
+    while True:
+        time.sleep(STATUS_SWEEP_INTERVAL)
+        with download_lock:
+            _gc_status()
+
+threading.Thread(target=_sweep_status_forever, name='status-gc', daemon=True).start()
+
+def register_download(status, message, dl_type):
+    """Track a new download and return its id."""
+    download_id = secrets.token_urlsafe(8)
+    with download_lock:
+        download_status[download_id] = DLStatus(status, message, dl_type)
+        _gc_status()
+    return download_id
+
+def update_status(download_id, **changes):
+    """Publish a new status snapshot for a download."""
+    current = download_status.get(download_id)
+    if current is not None:
+        download_status[download_id] = replace(current, **changes)
+        if changes.get('status') in ('completed', 'error'):
+            _finished_at.setdefault(download_id, time.monotonic())
+
+# Library structure cache, keyed on the artist and album directories' mtimes. While a
+# watchdog observer is running, a validated entry stays 'live' until the next
+# filesystem event, so requests skip even the mtime check.
+_library_cache = {'sig': None, 'value': None, 'etag': None, 'modified': None, 'gen': 0, 'live': False}
+_library_cache_lock = threading.Lock()
+_library_observer = None
+
+LIBRARY_CACHE_FILE = os.path.join(CONFIG_DIR, ".library_cache.json")
+
+def invalidate_library_cache():
+    with _library_cache_lock:
+        _library_cache['sig'] = None
+        _library_cache['gen'] += 1
+        _library_cache['live'] = False
+
+def _load_library_cache():
+    """Seed the library cache from disk so a restart doesn't force a full rescan."""
+    try:
+        with open(LIBRARY_CACHE_FILE, "rb") as f:
+            saved = (orjson or json).loads(f.read())
+        _library_cache.update(sig=tuple(map(tuple, saved['sig'])), value=saved['value'],
+                              etag=saved['etag'], modified=saved.get('modified'))
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+def _save_library_cache(sig, library, etag, modified):
+    tmp_path = LIBRARY_CACHE_FILE + ".part"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_json_bytes({'sig': sig, 'value': library, 'etag': etag, 'modified': modified}))
+        os.replace(tmp_path, LIBRARY_CACHE_FILE)
+    except OSError as e:
+        print(f"⚠️ Could not save library cache: {e}")
+
+_load_library_cache()
+
+def _start_library_watcher():
+    """Watch MUSIC_DIR with watchdog (inotify on Linux) when it is installed."""
+    global _library_observer
+    if Observer is None:
+        return
+
+    class _LibraryEvents(FileSystemEventHandler):
+        def on_any_event(self, event):
+            # Reads (e.g. tagging or streaming) don't change the library
+            if event.event_type not in ("opened", "closed", "closed_no_write"):
+                with _library_cache_lock:
+                    _library_cache['gen'] += 1
+                    _library_cache['live'] = False
+
+    try:
+        observer = Observer()
+        observer.schedule(_LibraryEvents(), MUSIC_DIR, recursive=True)
+        observer.daemon = True
+        observer.start()
+    except OSError as e:
+        print(f"⚠️ Library watcher unavailable, falling back to mtime checks: {e}")
+        return
+    _library_observer = observer
+
+def _run_capturing_tail(cmd, input=None, timeout=None, **kw):
+    """Run cmd keeping only the last lines of stderr, decoded only on failure."""
+    p = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        **kw
+    )
+    if input is not None:
+        try:
+            p.stdin.write(input)
+            p.stdin.close()
+        except BrokenPipeError:
+            pass
+
+    timed_out = threading.Event()
+    def kill():
+        timed_out.set()
+        p.kill()
+    timer = threading.Timer(timeout, kill) if timeout else None
+    if timer:
+        timer.start()
+
+    tail = deque(maxlen=STDERR_TAIL_LINES)
+    try:
+        for line in p.stderr:
+            tail.append(line)
+        returncode = p.wait()
+    finally:
+        if timer:
+            timer.cancel()
+        p.stderr.close()
+
+    if timed_out.is_set():
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    stderr = b"".join(tail).decode("utf-8", "replace") if returncode else ""
+    return subprocess.CompletedProcess(cmd, returncode, None, stderr)
+
+
+class _YDLLogger:
+    """Collects yt-dlp error output so callers can report it like stderr."""
+    def __init__(self):
+        self.errors = []
+
+    def debug(self, msg):
+        pass
+
+    def info(self, msg):
+        pass
+
+    def warning(self, msg):
+        pass
+
+    def error(self, msg):
+        self.errors.append(msg)
+
+
+# One YoutubeDL per worker thread and (cookies, format), so extractors and the
+# cookie jar are set up once per thread instead of once per download
+_ydl_local = threading.local()
+
+# Long-lived workers for per-track fetches: their thread-local YoutubeDL
+# instances survive from one album to the next, and this also caps how many
+# tracks download at once across all albums
+TRACK_WORKERS = 8
+_track_pool = ThreadPoolExecutor(max_workers=TRACK_WORKERS, thread_name_prefix='ydl')
+
+def _get_ydl(cookies, fmt):
+    instances = getattr(_ydl_local, 'instances', None)
+    if instances is None:
+        instances = _ydl_local.instances = {}
+    key = (cookies, fmt)
+    if key not in instances:
+        opts = {
+            'format': 'bestaudio/best',
+            'quiet': True,
+            'noprogress': True,
+            'nopart': True,
+            'writethumbnail': True,
+            # Same as the CLI default: skip unavailable entries instead of
+            # aborting the rest of a playlist/batch
+            'ignoreerrors': 'only_download',
+            'concurrent_fragment_downloads': int(YTDLP_N_FRAGS),
+            'http_chunk_size': 10 * 1024 * 1024,
+            'logger': _YDLLogger(),
+            'postprocessors': [
+                {'key': 'FFmpegExtractAudio', 'preferredcodec': fmt, 'preferredquality': '0'},
+                {'key': 'FFmpegMetadata', 'add_metadata': True},
+                {'key': 'EmbedThumbnail'},
+            ],
+        }
+        if cookies:
+            opts['cookiefile'] = COOKIES_FILE
+        instances[key] = YoutubeDL(opts)
+    return instances[key]
+
+
+# Several track workers can finish at once and YoutubeDLCookieJar.save() truncates
+# the file in place, so serialize saves and swap the new jar in atomically
+_cookie_save_lock = threading.Lock()
+
+def _save_ydl_cookies(ydl):
+    tmp_path = f"{COOKIES_FILE}.{threading.get_ident()}.part"
+    with _cookie_save_lock:
+        try:
+            ydl.cookiejar.save(tmp_path)
+            os.replace(tmp_path, COOKIES_FILE)
+        except OSError as e:
+            print(f"⚠️ Could not save cookies: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def _run_ytdlp_inprocess(output_template, urls, cookies, fmt):
+    ydl = _get_ydl(cookies, fmt)
+    logger = ydl.params['logger']
+    logger.errors = []
+    # The instance is reused, so point it at this call's output template and
+    # clear the return code a previous call's ignored error left behind
+    ydl.params['outtmpl'] = {'default': output_template}
+    ydl._download_retcode = 0
+
+    # Re-running a batch as MP3 would download every track that already made
+    # it to FLAC a second time; tracks a batch left short are retried one by one
+    retry_mp3 = fmt == "flac" and len(urls) == 1
+    try:
+        returncode = ydl.download(list(urls))
+        # With ignoreerrors a failed conversion is only logged, not raised
+        if returncode and retry_mp3 and any("Postprocessing:" in m for m in logger.errors):
+            print(f"FLAC conversion failed, retrying as MP3: {logger.errors[-1]}")
+            return _run_ytdlp_inprocess(output_template, urls, cookies, "mp3")
+    except DownloadError as e:
+        if retry_mp3 and e.exc_info and isinstance(e.exc_info[1], PostProcessingError):
+            print(f"FLAC conversion failed, retrying as MP3: {e}")
+            return _run_ytdlp_inprocess(output_template, urls, cookies, "mp3")
+        logger.errors.append(str(e))
+        returncode = 1
+    except Exception as e:
+        logger.errors.append(str(e))
+        returncode = 1
+    finally:
+        if cookies:
+            _save_ydl_cookies(ydl)
+    return subprocess.CompletedProcess(urls, returncode, "", "\n".join(logger.errors))
+
+
+def _run_ytdlp_subprocess(output_template, urls, cookies, fmt):
     cmd = [
         "yt-dlp",
         "--extract-audio",
         "--add-metadata",
         "--embed-thumbnail",
         "--embed-metadata",
+        "--concurrent-fragments", YTDLP_N_FRAGS,      # fetch stream fragments in parallel
+        "--http-chunk-size", "10M",                   # sidestep per-connection throttling
+        "--no-part",
+        "--no-progress",
         "-o", output_template,
-        url
+        *urls
     ]
     if cookies:
         cmd += ["--cookies", COOKIES_FILE]
+    cmd += ["--audio-format", fmt, "--audio-quality", "0"]
+    return _run_capturing_tail(cmd)
+
+
+def run_download_with_fallback(output_template, urls, cookies=True, quality='flac'):
+    """Download audio for one or more URLs in a single yt-dlp run.
 
+    Uses the yt_dlp module in-process when it is importable, which avoids
+    paying interpreter startup and extractor import per download; falls
+    back to the yt-dlp executable otherwise.
+    """
     # Set format
     fmt = "flac" if quality == "flac" else "mp3"
-    cmd += ["--audio-format", fmt, "--audio-quality", "0"]
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    if YoutubeDL is not None:
+        result = _run_ytdlp_inprocess(output_template, urls, cookies, fmt)
+    else:
+        result = _run_ytdlp_subprocess(output_template, urls, cookies, fmt)
+
     if result.returncode == 0:
         print(f"Successfully downloaded in {fmt.upper()}")
     else:
@@ -80,6 +485,326 @@ def run_download_with_fallback(output_template, url, cookies=True, quality='flac
     return result
 
 
+# === YTMusic lookup cache ===
+YTM_CACHE_TTL = 86400
+_ytm_cache = Cache(os.path.join(CONFIG_DIR, "ytm_cache")) if Cache is not None else None
+
+_HTTP_STATUS_RE = re.compile(r"Server returned HTTP (\d{3})")
+
+def _is_transient(exc):
+    """True for failures a retry can fix: dropped connections and 429/5xx replies."""
+    if isinstance(exc, (requests.ConnectionError, requests.Timeout)):
+        return True
+    # An error page from a proxy in front of YTMusic isn't JSON
+    if isinstance(exc, json.JSONDecodeError):
+        return True
+    m = _HTTP_STATUS_RE.search(str(exc))
+    return bool(m) and (m.group(1) == "429" or m.group(1).startswith("5"))
+
+def _with_retries(fn, *args, attempts=3, backoff=0.3):
+    """Call fn, retrying transient failures (429/5xx from YTMusic) with backoff."""
+    for attempt in range(attempts):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == attempts - 1 or not _is_transient(e):
+                raise
+            time.sleep(backoff * (attempt + 1))
+
+def _ytm_memoized(maxsize):
+    """Memoize a YTMusic lookup for YTM_CACHE_TTL, on disk when diskcache is installed.
+
+    The first argument (the YTMusic client) is left out of the on-disk key.
+    Without diskcache an in-memory LRU of maxsize entries is used instead;
+    its key includes the current TTL window so entries still expire.
+    """
+    def decorate(fn):
+        tag = fn.__name__
+
+        def call(ytmusic, *args):
+            return _with_retries(fn, ytmusic, *args)
+
+        if _ytm_cache is not None:
+            cached = _ytm_cache.memoize(name=tag, expire=YTM_CACHE_TTL, tag=tag, ignore={0})(call)
+
+            def cache_clear():
+                _ytm_cache.evict(tag)
+
+            @functools.wraps(fn)
+            def wrapper(ytmusic, *args):
+                return cached(ytmusic, *args)
+        else:
+            cached = functools.lru_cache(maxsize=maxsize)(lambda window, ytmusic, *args: call(ytmusic, *args))
+            cache_clear = cached.cache_clear
+
+            @functools.wraps(fn)
+            def wrapper(ytmusic, *args):
+                return cached(int(time.time() // YTM_CACHE_TTL), ytmusic, *args)
+
+        wrapper.cache_clear = cache_clear
+        return wrapper
+    return decorate
+
+
+@_ytm_memoized(maxsize=256)
+def _cached_get_album(ytmusic, browse_id):
+    """YTMusic.get_album; the same album is often retried in a session."""
+    return ytmusic.get_album(browse_id)
+
+
+@_ytm_memoized(maxsize=256)
+def _cached_get_song(ytmusic, video_id):
+    return ytmusic.get_song(video_id)
+
+
+@_ytm_memoized(maxsize=128)
+def _cached_search(ytmusic, query, filter):
+    """YTMusic.search, so a repeated query is answered instantly."""
+    return tuple(ytmusic.search(query, filter=filter))
+
+
+# === Per-track tagging ===
+# Track titles are cleaned/normalized again by the missing-track check, the
+# track-order map and each file lookup, so memoize both steps
+@functools.lru_cache(maxsize=1024)
+def _normalize_title(title):
+    if title.isascii():
+        return title.translate(_NORMALIZE_TABLE).lower()
+    return _NORMALIZE_RE.sub('', title).lower()
+
+
+@functools.lru_cache(maxsize=1024)
+def _clean_title(title):
+    cleaned = _LEAD_NUM_RE.sub("", title)
+    return _CLEAN_RE.sub("", cleaned).strip()
+
+
+def _build_track_order(album_data):
+    """Map normalized, cleaned track titles to their YTMusic track number."""
+    tracks = enumerate((album_data or {}).get("tracks", []), start=1)
+    # Built back to front so a repeated title (e.g. two "Intro"s) keeps its earliest slot
+    return {_normalize_title(_clean_title(t["title"])): idx for idx, t in reversed(list(tracks))}
+
+
+def _match_track_number(track_order, cleaned_title):
+    # File titles go through the same cleaner as the track list, so one key suffices
+    return track_order.get(_normalize_title(cleaned_title))
+
+
+def _tag_mp3(path, albumartist, album, fallback_title, track_order, img_data, cover_sha):
+    try:
+        audio = ID3(path)
+    except ID3NoHeaderError:
+        audio = ID3()
+
+    title = audio["TIT2"].text[0] if "TIT2" in audio else fallback_title
+    cleaned_title = _clean_title(title)
+    track_num = _match_track_number(track_order, cleaned_title)
+
+    # Skip the rewrite entirely when tags and cover already match
+    current = (
+        audio["TPE2"].text[0] if "TPE2" in audio else None,
+        audio["TALB"].text[0] if "TALB" in audio else None,
+        title,
+        audio["TRCK"].text[0] if "TRCK" in audio else None,
+    )
+    wanted = (albumartist, album or current[1], cleaned_title,
+              str(track_num) if track_num else current[3])
+    sha_frame = audio.get("TXXX:COVER_SHA")
+    art_ok = (not img_data
+              or (sha_frame is not None and sha_frame.text[0] == cover_sha)
+              or [p.data for p in audio.getall("APIC")] == [img_data])
+    if current == wanted and art_ok:
+        return cleaned_title, track_num
+
+    audio.setall("TPE2", [TPE2(encoding=3, text=albumartist)])
+    if album:
+        audio.setall("TALB", [TALB(encoding=3, text=album)])
+    audio.setall("TIT2", [TIT2(encoding=3, text=cleaned_title)])
+    if track_num:
+        audio.setall("TRCK", [TRCK(encoding=3, text=str(track_num))])
+    if img_data and not art_ok:
+        audio.delall("APIC")
+        audio.add(APIC(
+            encoding=3,
+            mime="image/jpeg",
+            type=3,
+            desc="Cover",
+            data=img_data
+        ))
+        audio.setall("TXXX:COVER_SHA", [TXXX(encoding=3, desc="COVER_SHA", text=cover_sha)])
+    audio.save(path, v2_version=3)
+    return cleaned_title, track_num
+
+
+def _tag_flac(path, albumartist, album, fallback_title, track_order, img_data, cover_sha):
+    audio = FLAC(path)
+
+    title = audio.get("title", [fallback_title])[0]
+    cleaned_title = _clean_title(title)
+    track_num = _match_track_number(track_order, cleaned_title)
+
+    # Skip the rewrite entirely when tags and cover already match
+    current = (
+        audio.get("albumartist", [None])[0],
+        audio.get("album", [None])[0],
+        title,
+        audio.get("tracknumber", [None])[0],
+    )
+    wanted = (albumartist, album or current[1], cleaned_title,
+              str(track_num) if track_num else current[3])
+    art_ok = (not img_data
+              or audio.get("cover_sha", [None])[0] == cover_sha
+              or [p.data for p in audio.pictures] == [img_data])
+    if current == wanted and art_ok:
+        return cleaned_title, track_num
+
+    audio["albumartist"] = albumartist
+    if album:
+        audio["album"] = album
+    audio["title"] = cleaned_title
+    if track_num:
+        audio["tracknumber"] = str(track_num)
+    if img_data and not art_ok:
+        audio["cover_sha"] = cover_sha
+        audio.clear_pictures()
+        pic = Picture()
+        pic.type = 3
+        pic.mime = "image/jpeg"
+        pic.desc = "Cover"
+        pic.data = img_data
+        audio.add_picture(pic)
+    audio.save()
+    return cleaned_title, track_num
+
+
+# Tag writers by lowercase file extension
+_EXT_HANDLERS = {".mp3": _tag_mp3, ".flac": _tag_flac}
+_AUDIO_EXTS = tuple(_EXT_HANDLERS)
+
+
+def _split_audio_name(name):
+    """Return (stem, lowercase ext) for a supported audio file name, else None."""
+    stem, ext = os.path.splitext(name)
+    ext = ext.lower()
+    return (stem, ext) if ext in _EXT_HANDLERS else None
+
+
+def _tag_one(path, stem, ext, albumartist, album, track_order, img_data, cover_sha):
+    """Tag a single track; module-level so it can run in a process pool."""
+    try:
+        cleaned_title, track_num = _EXT_HANDLERS[ext](
+            path, albumartist, album, stem, track_order, img_data, cover_sha)
+    except Exception as e:
+        print(f"❌ Failed to update {os.path.basename(path)}: {e}")
+        return
+    if track_num:
+        print(f"✅ Track {track_num}: {cleaned_title}")
+    else:
+        print(f"⚠️ No track number match for: {cleaned_title}")
+
+
+# Recently used cover images by URL, so batches of albums sharing art skip the disk
+ART_MEMO_SIZE = 32
+_art_memo = OrderedDict()
+_art_memo_lock = threading.Lock()
+
+def _downscale_art(data):
+    """Re-encode oversized cover art as a JPEG no larger than ART_MAX_DIM (needs Pillow)."""
+    if not ART_MAX_DIM or Image is None:
+        return data
+    try:
+        with Image.open(io.BytesIO(data)) as im:
+            if max(im.size) <= ART_MAX_DIM and im.format == "JPEG":
+                return data
+            im = im.convert("RGB")
+            im.thumbnail((ART_MAX_DIM, ART_MAX_DIM), Image.LANCZOS)
+            buf = io.BytesIO()
+            im.save(buf, "JPEG", quality=88, optimize=True, progressive=True)
+            return buf.getvalue()
+    except OSError as e:
+        print(f"⚠️ Could not resize album art: {e}")
+        return data
+
+
+# Deletes get their own workers so they never queue behind downloads
+_delete_pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='rm')
+
+
+def _purge_folder(path):
+    """Delete a folder tree; a symlinked folder loses only the link, never its target."""
+    if os.path.islink(path):
+        os.unlink(path)
+    else:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def _reap_trash():
+    """Queue purges for .trash-* dirs a previous process didn't get to delete."""
+    try:
+        with os.scandir(MUSIC_DIR) as it:
+            entries = list(it)
+    except FileNotFoundError:
+        return
+    trash = [e.path for e in entries if e.name.startswith('.trash-')]
+    for artist_entry in entries:
+        if artist_entry.name.startswith('.'):
+            continue
+        try:
+            with os.scandir(artist_entry.path) as it:
+                trash += [e.path for e in it if e.name.startswith('.trash-')]
+        except OSError:
+            continue
+    for path in trash:
+        _delete_pool.submit(_purge_folder, path)
+
+
+# Small pool for prefetching covers alongside the (much longer) track downloads
+_art_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='art')
+
+
+def _fetch_art(url):
+    """Return the image bytes for url from memory, ART_CACHE_DIR or the network."""
+    with _art_memo_lock:
+        data = _art_memo.get(url)
+        if data is not None:
+            _art_memo.move_to_end(url)
+            return data
+    # Resized covers are cached separately from the originals
+    key = hashlib.sha1(url.encode()).hexdigest()
+    if ART_MAX_DIM and Image is not None:
+        key += f"-{ART_MAX_DIM}"
+    cache_path = os.path.join(ART_CACHE_DIR, f"{key}.jpg")
+    if not os.path.exists(cache_path):
+        tmp_path = f"{cache_path}.{threading.get_ident()}.part"
+        try:
+            with _http.get(url, stream=True, timeout=HTTP_TIMEOUT) as r:
+                r.raise_for_status()
+                r.raw.decode_content = True
+                with open(tmp_path, "wb") as f:
+                    shutil.copyfileobj(r.raw, f, 64 * 1024)
+            if ART_MAX_DIM and Image is not None:
+                with open(tmp_path, "r+b") as f:
+                    original = f.read()
+                    resized = _downscale_art(original)
+                    if resized is not original:
+                        f.seek(0)
+                        f.write(resized)
+                        f.truncate()
+            os.replace(tmp_path, cache_path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    with open(cache_path, "rb") as f:
+        data = f.read()
+    with _art_memo_lock:
+        _art_memo[url] = data
+        while len(_art_memo) > ART_MEMO_SIZE:
+            _art_memo.popitem(last=False)
+    return data
+
+
 class MusicDownloader:
     def __init__(self):
         try:
@@ -93,16 +818,16 @@ class MusicDownloader:
                 self.ytmusic = None
 
     def sanitize_filename(self, name):
-        return re.sub(r'[\\/*?:"<>|]', '', name)
+        return name.translate(_SANITIZE_TABLE)
 
     def normalize_title(self, title):
-        return re.sub(r'\W+', '', title).lower()
+        return _normalize_title(title)
 
     def search_albums(self, query):
         if not self.ytmusic or not query:
             return []
         try:
-            results = self.ytmusic.search(query, filter="albums")
+            results = _cached_search(self.ytmusic, query, "albums")
             return [
                 {
                     'browseId': a.get('browseId'),
@@ -117,114 +842,64 @@ class MusicDownloader:
             print(f"Search error: {e}")
             return []
 
-    def get_high_quality_album_art(self, album_data):
+    def search_album(self, query):
+        """Return the best album match for a query, or None."""
+        results = self.search_albums(query)
+        return results[0] if results else None
+
+    def get_high_quality_album_art(self, album_data, folder):
+        """Place the largest thumbnail at folder/cover.jpg and return its bytes.
+
+        Images are cached by URL in memory and by URL hash under ART_CACHE_DIR,
+        so covers shared between albums and singles are only downloaded once.
+        """
         thumbs = album_data.get("thumbnails", [])
         if not thumbs:
             return None
         best = max(thumbs, key=lambda t: t.get("width", 0))
+        cover_path = os.path.join(folder, "cover.jpg")
         try:
-            r = requests.get(best["url"], timeout=30)
-            r.raise_for_status()
-            return r.content
+            img_data = _fetch_art(best["url"])
+            # Re-runs find the same cover in place; don't rewrite it
+            if not (os.path.exists(cover_path) and os.path.getsize(cover_path) == len(img_data)):
+                with open(cover_path, "wb") as f:
+                    f.write(img_data)
+            return img_data
         except Exception as e:
             print(f"Album art download failed: {e}")
             return None
 
-    def embed_album_art(self, folder, img_data):
-        if not img_data:
-            return
-        cover_path = os.path.join(folder, "cover.jpg")
-        with open(cover_path, "wb") as f:
-            f.write(img_data)
-
-        for file in os.listdir(folder):
-            path = os.path.join(folder, file)
-            if file.lower().endswith(".mp3"):
-                try:
-                    audio = ID3(path)
-                    audio.delall("APIC")
-                    audio.add(APIC(
-                        encoding=3,
-                        mime="image/jpeg",
-                        type=3,
-                        desc="Cover",
-                        data=img_data
-                    ))
-                    audio.save(v2_version=3)
-                except Exception as e:
-                    print(f"MP3 art embed failed: {e}")
-            elif file.lower().endswith(".flac"):
-                try:
-                    audio = FLAC(path)
-                    audio.clear_pictures()
-                    pic = Picture()
-                    pic.type = 3
-                    pic.mime = "image/jpeg"
-                    pic.desc = "Cover"
-                    pic.data = img_data
-                    audio.add_picture(pic)
-                    audio.save()
-                except Exception as e:
-                    print(f"FLAC art embed failed: {e}")
-
     def clean_title(self, title):
-        cleaned = re.sub(r"^\d+\s*[-.]?\s*", "", title)
-        cleaned = re.sub(r"\s*\(feat\..*?\)", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*\(Explicit\)", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*\[Explicit\]", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*\[.*?\]", "", cleaned)
-        return cleaned.strip()
-
-    def fix_track_metadata(self, folder, albumartist, album_data):
-        """Fix track numbers and clean titles using YTMusic track order."""
-        print(f"🎯 Fixing track metadata for: {albumartist}")
-        track_order = {}
-        if album_data and "tracks" in album_data:
-            for idx, track in enumerate(album_data["tracks"], start=1):
-                raw = track["title"]
-                clean = self.clean_title(raw)
-                track_order[self.normalize_title(raw)] = idx
-                track_order[self.normalize_title(clean)] = idx
-
-        files = [f for f in os.listdir(folder) if f.lower().endswith((".mp3", ".flac"))]
-        for file in sorted(files):  # Keep original file order
-            path = os.path.join(folder, file)
-            try:
-                if file.lower().endswith(".mp3"):
-                    try:
-                        audio = EasyID3(path)
-                    except ID3NoHeaderError:
-                        audio = EasyID3()
-                        audio.save(path)
-                        audio = EasyID3(path)
-                elif file.lower().endswith(".flac"):
-                    audio = FLAC(path)
-                else:
-                    continue
+        return _clean_title(title)
 
-                title = audio.get("title", [os.path.splitext(file)[0]])[0]
-                if isinstance(title, list):
-                    title = title[0]
-                cleaned_title = self.clean_title(title)
-
-                # Set metadata
-                audio["albumartist"] = albumartist
-                audio["title"] = cleaned_title
-
-                # Match track number
-                norm_cleaned = self.normalize_title(cleaned_title)
-                norm_orig = self.normalize_title(title)
-                track_num = track_order.get(norm_cleaned) or track_order.get(norm_orig)
+    def _process_album_files(self, folder, albumartist, album_data, img_data):
+        """Embed album art and fix titles/track numbers, opening each file once."""
+        print(f"🎯 Fixing track metadata for: {albumartist}")
+        cover_sha = None
+        if img_data:
+            # Stored alongside the picture so re-runs can skip re-embedding it
+            cover_sha = hashlib.sha1(img_data).hexdigest()
 
-                if track_num:
-                    audio["tracknumber"] = str(track_num)
-                    print(f"✅ Track {track_num}: {cleaned_title}")
-                else:
-                    print(f"⚠️ No track number match for: {cleaned_title}")
+        track_order = _build_track_order(album_data)
+        album = (album_data or {}).get("title")
+        files = []
+        with os.scandir(folder) as it:
+            for e in it:
+                split = _split_audio_name(e.name)
+                if split:
+                    files.append((e.path, *split))
+        if not files:
+            return
 
-                audio.save()
-            except Exception as e:
-                print(f"❌ Failed to update {file}: {e}")
+        # Files are independent, so tag them concurrently; TAG_POOL=process
+        # switches to a process pool when mutagen parsing is GIL-bound.
+        pool_cls = ProcessPoolExecutor if TAG_POOL == "process" else ThreadPoolExecutor
+        n = len(files)
+        with pool_cls(max_workers=min(8, n)) as ex:
+            paths, stems, exts = zip(*files)
+            list(ex.map(_tag_one, paths, stems, exts,
+                        [albumartist] * n, [album] * n, [track_order] * n,
+                        [img_data] * n, [cover_sha] * n))
 
     def run_beets_on_album(self, path):
         """Run beets to move files and write final tags (no autotag)."""
@@ -247,14 +922,12 @@ class MusicDownloader:
         env["HOME"] = "/home/appuser"
 
         try:
-            result = subprocess.run(
+            result = _run_capturing_tail(
                 cmd,
                 env=env,
                 cwd="/app",
-                capture_output=True,
-                text=True,
                 timeout=600,
-                input="\n"  # Auto-accept any prompt
+                input=b"\n"  # Auto-accept any prompt
             )
             if result.returncode == 0:
                 print("✅ Beets organization complete")
@@ -263,76 +936,255 @@ class MusicDownloader:
         except Exception as e:
             print(f"❌ Beets error: {e}")
 
-    def download_album(self, album_info, base_dir, artist_name, album_name, download_id, quality='flac'):
+    def _prepare_album(self, album_info, base_dir, artist_name, album_name):
+        """Fetch album metadata and create its folder; returns the album job."""
+        browse_id = album_info['browseId']
         try:
-            with download_lock:
-                download_status[download_id]['status'] = 'searching'
-                download_status[download_id]['message'] = 'Fetching metadata...'
+            if album_info.get("tracks") and album_info.get("thumbnails"):
+                # Already a full album payload; no need for another round-trip
+                album_data = album_info
+            else:
+                album_data = _cached_get_album(self.ytmusic, browse_id)
+            if not album_data.get("thumbnails") and album_info.get("thumbnails"):
+                # Copy rather than mutate: album_data may be the memoized get_album result
+                album_data = {**album_data, "thumbnails": album_info["thumbnails"]}
+        except Exception as e:
+            print(f"⚠️ Metadata fetch failed: {e}")
+            album_data = {"tracks": [], "thumbnails": album_info.get("thumbnails", [])}
 
-            if not self.ytmusic:
-                raise Exception("YTMusic API not available")
+        safe_artist = self.sanitize_filename(artist_name)
+        safe_album = self.sanitize_filename(album_name)
+        album_folder = os.path.join(base_dir, safe_artist, safe_album)
+        os.makedirs(album_folder, exist_ok=True)
 
-            browse_id = album_info['browseId']
-            try:
-                album_data = self.ytmusic.get_album(browse_id)
-                if not album_data.get("thumbnails") and album_info.get("thumbnails"):
-                    album_data["thumbnails"] = album_info["thumbnails"]
-            except Exception as e:
-                print(f"⚠️ Metadata fetch failed: {e}")
-                album_data = {"tracks": [], "thumbnails": album_info.get("thumbnails", [])}
-
-            safe_artist = self.sanitize_filename(artist_name)
-            safe_album = self.sanitize_filename(album_name)
-            album_folder = os.path.join(base_dir, safe_artist, safe_album)
-            os.makedirs(album_folder, exist_ok=True)
-
-            # Save metadata
-            with open(os.path.join(album_folder, "album_info.json"), "w") as f:
-                json.dump(album_data, f, indent=2)
-
-            # Build URL
-            search_url = f"https://music.youtube.com/browse/{browse_id}"
-            output_template = os.path.join(album_folder, "%(title)s.%(ext)s")
-
-            with download_lock:
-                download_status[download_id]['status'] = 'downloading'
-                download_status[download_id]['message'] = f'Downloading tracks from {artist_name} - {album_name}...'
-
-            # Download
-            result = run_download_with_fallback(output_template, search_url, cookies=True, quality=quality)
+        # Save metadata
+        with open(os.path.join(album_folder, "album_info.json"), "wb") as f:
+            f.write(_json_bytes(album_data, indent=DEBUG_JSON))
+
+        return {
+            'artist': artist_name,
+            'album': album_name,
+            'browse_id': browse_id,
+            'album_data': album_data,
+            'folder': album_folder,
+        }
+
+    def _album_art(self, job):
+        """Return the cover bytes for a job, waiting on its prefetch if one was started."""
+        art_future = job.get('art')
+        if art_future is None:
+            return self.get_high_quality_album_art(job['album_data'], job['folder'])
+        try:
+            return art_future.result(timeout=60)
+        except Exception as e:
+            print(f"Album art download failed: {e}")
+            return None
+
+    def _unstage_album(self, job, img_data):
+        """Tag staged tracks on local disk, then move them into the album folder.
+
+        Returns False when nothing was staged for the job.
+        """
+        staged = job.get('staging')
+        if not staged or not os.path.isdir(staged):
+            return False
+        self._process_album_files(staged, job['artist'], job['album_data'], img_data)
+        with os.scandir(staged) as it:
+            for entry in it:
+                shutil.move(entry.path, os.path.join(job['folder'], entry.name))
+        return True
+
+    def _finalize_album(self, job, download_id):
+        """Tag, organize and fix permissions for a downloaded album folder."""
+        album_folder = job['folder']
+
+        # ✅ Step 1: Embed real album art and fix track numbers/titles in one pass
+        update_status(download_id, message='Embedding album art and fixing track metadata...')
+        img_data = self._album_art(job)
+        if not self._unstage_album(job, img_data):
+            self._process_album_files(album_folder, job['artist'], job['album_data'], img_data)
+
+        # ✅ Step 2: Run Beets to organize
+        update_status(download_id, message='Organizing with Beets...')
+        self.run_beets_on_album(album_folder)
+
+        # Permissions
+        set_file_permissions(album_folder)
+        invalidate_library_cache()
+
+    def _missing_track_urls(self, job):
+        """Return watch URLs for album tracks not yet present in the folder.
+
+        An empty list means the album is already complete. None means the
+        whole album should be fetched (nothing on disk yet, or the present
+        files can't be matched against the track list).
+        """
+        tracks = job['album_data'].get('tracks', [])
+        with os.scandir(job['folder']) as it:
+            splits = [_split_audio_name(e.name) for e in it]
+        present = {_normalize_title(_clean_title(split[0])) for split in splits if split}
+        if not present or not tracks:
+            return None
+        if len(present) >= len(tracks):
+            return []
+        missing = [
+            f"https://music.youtube.com/watch?v={t['videoId']}"
+            for t in tracks
+            if t.get('videoId') and _normalize_title(_clean_title(t['title'])) not in present
+        ]
+        return missing or None
+
+    def _download_album_job(self, job, download_id, quality):
+        output_template = os.path.join(job['staging'], "%(title)s.%(ext)s")
+        track_urls = [
+            f"https://music.youtube.com/watch?v={t['videoId']}"
+            for t in job['album_data'].get('tracks', []) if t.get('videoId')
+        ]
+        urls = job.get('urls') or track_urls or [f"https://music.youtube.com/browse/{job['browse_id']}"]
+        label = f"{job['artist']} - {job['album']}"
+
+        update_status(download_id, status='downloading', message=f"Downloading tracks from {label}...")
+
+        if len(urls) == 1:
+            result = run_download_with_fallback(output_template, urls, cookies=True, quality=quality)
             if result.returncode != 0:
                 raise Exception(f"Download failed: {result.stderr}")
+            return
 
-            # ✅ Step 1: Embed real album art
-            with download_lock:
-                download_status[download_id]['message'] = 'Embedding high-quality album art...'
-            img_data = self.get_high_quality_album_art(album_data)
-            if img_data:
-                self.embed_album_art(album_folder, img_data)
+        # Tracks are independent and network-bound, so fetch several at once
+        errors = []
+        futures = [
+            _track_pool.submit(run_download_with_fallback, output_template, [url], True, quality)
+            for url in urls
+        ]
+        for done, future in enumerate(as_completed(futures), start=1):
+            result = future.result()
+            if result.returncode != 0:
+                errors.append(result.stderr)
+            update_status(download_id, message=f"Downloaded {done}/{len(urls)} tracks from {label}...")
+        if errors:
+            raise Exception(f"Download failed for {len(errors)} track(s): {errors[0]}")
 
-            # ✅ Step 2: Fix track numbers and titles
-            with download_lock:
-                download_status[download_id]['message'] = 'Fixing track order and metadata...'
-            self.fix_track_metadata(album_folder, artist_name, album_data)
+    def download_album(self, album_info, base_dir, artist_name, album_name, download_id, quality='flac'):
+        self.download_albums([(album_info, artist_name, album_name)], base_dir, download_id, quality)
+
+    def download_albums(self, albums, base_dir, download_id, quality='flac', failed=()):
+        """Download (album_info, artist, album) entries, batching yt-dlp where possible.
 
-            # ✅ Step 3: Run Beets to organize
-            with download_lock:
-                download_status[download_id]['message'] = 'Organizing with Beets...'
-            self.run_beets_on_album(album_folder)
+        Tracks are downloaded and tagged in a local staging folder and only
+        moved into the album folder once finished, so mutagen's rewrites never
+        go over a network mount. Albums whose playlist id is known are fetched
+        by one yt-dlp run, so the interpreter/extractor startup cost is paid
+        once for the whole batch.
 
-            # Permissions
-            set_file_permissions(album_folder)
+        Each album succeeds or fails on its own; failed is a list of
+        (label, reason) pairs for entries the caller could not resolve, and
+        the final status reports every failure by album.
+        """
+        failed = list(failed)
+        try:
+            update_status(download_id, status='searching', message='Fetching metadata...')
 
-            with download_lock:
-                download_status[download_id]['status'] = 'completed'
-                download_status[download_id]['message'] = f'Successfully processed {artist_name} - {album_name}'
+            if albums and not self.ytmusic:
+                raise Exception("YTMusic API not available")
+
+            jobs = []
+            for info, artist, album in albums:
+                try:
+                    jobs.append(self._prepare_album(info, base_dir, artist, album))
+                except Exception as e:
+                    failed.append((f"{artist} - {album}", str(e)))
+            # Fetch covers while yt-dlp runs; _finalize_album waits on the result
+            for job in jobs:
+                job['art'] = _art_pool.submit(self.get_high_quality_album_art, job['album_data'], job['folder'])
+
+            # Retries skip albums already on disk and only fetch missing tracks
+            pending = []
+            for job in jobs:
+                job['urls'] = self._missing_track_urls(job)
+                if job['urls'] == []:
+                    print(f"⏭️ Already downloaded: {job['artist']} - {job['album']}")
+                else:
+                    pending.append(job)
+
+            batched, separate = [], []
+            for job in pending:
+                can_batch = (len(pending) > 1 and job['urls'] is None
+                             and job['album_data'].get('audioPlaylistId'))
+                (batched if can_batch else separate).append(job)
+
+            with tempfile.TemporaryDirectory(prefix="music-dl-", dir=STAGING_DIR) as staging:
+                for job in batched:
+                    job['staging'] = os.path.join(staging, job['album_data']['audioPlaylistId'])
+                for job in separate:
+                    job['staging'] = os.path.join(staging, job['browse_id'])
+                try:
+                    if batched:
+                        update_status(download_id, status='downloading', message=f'Downloading {len(batched)} albums...')
+
+                        output_template = os.path.join(staging, "%(playlist_id)s", "%(title)s.%(ext)s")
+                        urls = [
+                            f"https://music.youtube.com/playlist?list={j['album_data']['audioPlaylistId']}"
+                            for j in batched
+                        ]
+                        result = run_download_with_fallback(output_template, urls, cookies=True, quality=quality)
+                        if result.returncode != 0:
+                            # Unavailable entries are skipped, so blame only albums left short
+                            for job in batched:
+                                missing = self._count_missing_staged(job)
+                                if missing:
+                                    job['error'] = f"Download failed for {missing} track(s): {result.stderr}"
+
+                    for job in separate:
+                        try:
+                            self._download_album_job(job, download_id, quality)
+                        except Exception as e:
+                            job['error'] = str(e)
+
+                    # Metadata post-processing still runs per album folder. Failed
+                    # albums aren't handed to beets; their finished tracks are kept
+                    # below so a retry only fetches what's missing.
+                    for job in jobs:
+                        if 'error' in job:
+                            continue
+                        try:
+                            self._finalize_album(job, download_id)
+                        except Exception as e:
+                            job['error'] = str(e)
+                finally:
+                    # Keep every track that did download, so a retry only fetches the missing ones
+                    for job in jobs:
+                        try:
+                            if job.get('staging') and os.path.isdir(job['staging']):
+                                self._unstage_album(job, self._album_art(job))
+                        except Exception as e:
+                            print(f"⚠️ Could not keep staged tracks for {job['artist']} - {job['album']}: {e}")
+
+            failed += [(f"{j['artist']} - {j['album']}", j['error']) for j in jobs if 'error' in j]
+            names = ', '.join(f"{j['artist']} - {j['album']}" for j in jobs if 'error' not in j)
+            if not failed:
+                update_status(download_id, status='completed', message=f'Successfully processed {names}')
+            else:
+                for label, reason in failed:
+                    print(f"❌ Download failed for {label}: {reason}")
+                errors = '; '.join(f'{label}: {reason}' for label, reason in failed)
+                message = f'Processed {names}. Failed: {errors}' if names else f'Failed: {errors}'
+                update_status(download_id, status='error', message=message)
 
         except Exception as e:
-            with download_lock:
-                download_status[download_id]['status'] = 'error'
-                download_status[download_id]['message'] = f'Error: {str(e)}'
+            update_status(download_id, status='error', message=f'Error: {str(e)}')
             print(f"❌ Download failed: {e}")
 
+    def _count_missing_staged(self, job):
+        """Number of album tracks a batched run did not leave in the job's staging dir."""
+        tracks = job['album_data'].get('tracks', [])
+        try:
+            with os.scandir(job['staging']) as it:
+                staged = sum(1 for e in it if _split_audio_name(e.name))
+        except FileNotFoundError:
+            staged = 0
+        return max(len(tracks) - staged, 0) if tracks else int(staged == 0)
+
     def extract_video_id(self, url):
         parsed = urlparse(url)
         if parsed.hostname == "youtu.be":
@@ -343,39 +1195,32 @@ class MusicDownloader:
 
     def download_song(self, url, download_id, quality='flac'):
         try:
-            with download_lock:
-                download_status[download_id]['status'] = 'downloading'
-                download_status[download_id]['message'] = 'Analyzing...'
+            update_status(download_id, status='downloading', message='Analyzing...')
             video_id = self.extract_video_id(url)
             song_artist = "Unknown Artist"
             album_name = None
             if video_id and self.ytmusic:
                 try:
-                    details = self.ytmusic.get_song(video_id)
+                    details = _cached_get_song(self.ytmusic, video_id)
                     if "videoDetails" in details:
                         song_artist = self.sanitize_filename(details["videoDetails"].get("author", song_artist))
                         title = details["videoDetails"]["title"]
-                        results = self.ytmusic.search(f"{song_artist} - {title}", filter="songs")
+                        results = _cached_search(self.ytmusic, f"{song_artist} - {title}", "songs")
                         if results and results[0].get("album"):
                             album_name = self.sanitize_filename(results[0]["album"]["name"])
                 except Exception: pass
             output_template = os.path.join(MUSIC_DIR, f"{song_artist}", f"{album_name or 'Singles'}/%(title)s.%(ext)s")
-            result = run_download_with_fallback(output_template, url, cookies=False, quality=quality)
+            result = run_download_with_fallback(output_template, [url], cookies=False, quality=quality)
             if result.returncode != 0: raise Exception(result.stderr)
-            with download_lock:
-                download_status[download_id]['status'] = 'completed'
-                download_status[download_id]['message'] = f'Saved to {os.path.dirname(output_template)}'
+            invalidate_library_cache()
+            update_status(download_id, status='completed', message=f'Saved to {os.path.dirname(output_template)}')
         except Exception as e:
-            with download_lock:
-                download_status[download_id]['status'] = 'error'
-                download_status[download_id]['message'] = f'Error: {str(e)}'
+            update_status(download_id, status='error', message=f'Error: {str(e)}')
 
     def download_artist_song(self, artist, title, download_id, quality='flac'):
         try:
-            with download_lock:
-                download_status[download_id]['status'] = 'downloading'
-                download_status[download_id]['message'] = f'Searching {artist} - {title}...'
-            results = self.ytmusic.search(f"{artist} - {title}", filter="songs")
+            update_status(download_id, status='downloading', message=f'Searching {artist} - {title}...')
+            results = _cached_search(self.ytmusic, f"{artist} - {title}", "songs")
             if not results: raise Exception("No song found")
             song = results[0]
             video_id = song.get("videoId")
@@ -383,43 +1228,108 @@ class MusicDownloader:
             album_name = self.sanitize_filename(song["album"]["name"]) if song.get("album") else None
             output_template = os.path.join(MUSIC_DIR, f"{song_artist}", f"{album_name or 'Singles'}/%(title)s.%(ext)s")
             url = f"https://music.youtube.com/watch?v={video_id}"
-            result = run_download_with_fallback(output_template, url, cookies=False, quality=quality)
+            result = run_download_with_fallback(output_template, [url], cookies=False, quality=quality)
             if result.returncode != 0: raise Exception(result.stderr)
-            with download_lock:
-                download_status[download_id]['status'] = 'completed'
-                download_status[download_id]['message'] = f'Downloaded: {title} by {song_artist}'
+            invalidate_library_cache()
+            update_status(download_id, status='completed', message=f'Downloaded: {title} by {song_artist}')
         except Exception as e:
-            with download_lock:
-                download_status[download_id]['status'] = 'error'
-                download_status[download_id]['message'] = f'Error: {str(e)}'
+            update_status(download_id, status='error', message=f'Error: {str(e)}')
+
+    def _remove_folder(self, path):
+        """Drop path from the library at once and delete its contents in the background."""
+        # Renaming within the same parent never crosses a filesystem (symlinked or
+        # mounted artist dirs), and the dot-dir is hidden from the library scan
+        trash = os.path.join(os.path.dirname(path), f".trash-{uuid.uuid4().hex}")
+        try:
+            os.replace(path, trash)
+        except OSError as e:
+            print(f"⚠️ Could not move {path} aside ({e}); deleting in place")
+            _purge_folder(path)
+        else:
+            _delete_pool.submit(_purge_folder, trash)
+        invalidate_library_cache()
 
     def delete_artist_folder(self, artist):
         path = os.path.join(MUSIC_DIR, self.sanitize_filename(artist))
-        if os.path.isdir(path): shutil.rmtree(path); return True
+        if os.path.isdir(path): self._remove_folder(path); return True
         return False
 
     def delete_artist_album(self, artist, album):
         path = os.path.join(MUSIC_DIR, self.sanitize_filename(artist), self.sanitize_filename(album))
-        if os.path.isdir(path): shutil.rmtree(path); return True
+        if os.path.isdir(path): self._remove_folder(path); return True
         return False
 
     def get_library_structure(self):
+        """Return the cached library tree, rescanning only when an artist or album dir changed."""
+        return self.get_library_snapshot()[0]
+
+    def get_library_snapshot(self):
+        """Return (library, etag, modified); both change whenever the library content does."""
+        with _library_cache_lock:
+            if _library_cache['live']:
+                return _library_cache['value'], _library_cache['etag'], _library_cache['modified']
+            gen = _library_cache['gen']
+        watched = _library_observer is not None
+        try:
+            with os.scandir(MUSIC_DIR) as it:
+                # Dot-dirs hold staging/cache data, not artists
+                artists = [e for e in it if e.is_dir() and not e.name.startswith('.')]
+        except FileNotFoundError:
+            return {}, None, None
+        sig = self._library_signature(artists)
+        with _library_cache_lock:
+            if sig == _library_cache['sig']:
+                # Only trust it until the next event if nothing fired meanwhile
+                _library_cache['live'] = watched and gen == _library_cache['gen']
+                return _library_cache['value'], _library_cache['etag'], _library_cache['modified']
+        library = self._scan_library(artists)
+        etag = hashlib.md5(_json_bytes(library, sort_keys=True)).hexdigest()
+        with _library_cache_lock:
+            # A rescan that finds the same content keeps its Last-Modified time
+            if etag != _library_cache['etag'] or _library_cache['modified'] is None:
+                _library_cache['modified'] = int(time.time())
+            modified = _library_cache['modified']
+            _library_cache['sig'] = sig
+            _library_cache['value'] = library
+            _library_cache['etag'] = etag
+            _library_cache['live'] = watched and gen == _library_cache['gen']
+        _save_library_cache(sig, library, etag, modified)
+        return library, etag, modified
+
+    def _library_signature(self, artists):
+        """Sorted (path, mtime_ns) pairs for every artist and album dir.
+
+        Adding or removing a track only bumps its album dir's mtime, so the
+        artist dirs alone would let a cache saved before a restart go stale.
+        """
+        sig = []
+        for artist_entry in artists:
+            sig.append((artist_entry.name, artist_entry.stat().st_mtime_ns))
+            with os.scandir(artist_entry.path) as artist_it:
+                sig.extend((f"{artist_entry.name}/{e.name}", e.stat().st_mtime_ns) for e in artist_it
+                           if e.is_dir() and not e.name.startswith('.'))
+        return tuple(sorted(sig))
+
+    def _scan_library(self, artists):
+        """Build the library tree from the artist DirEntry objects already listed."""
         library = {}
-        if not os.path.exists(MUSIC_DIR): return library
-        for artist in os.listdir(MUSIC_DIR):
-            artist_path = os.path.join(MUSIC_DIR, artist)
-            if os.path.isdir(artist_path):
-                library[artist] = []
-                for album in os.listdir(artist_path):
-                    album_path = os.path.join(artist_path, album)
-                    if os.path.isdir(album_path):
-                        count = len([f for f in os.listdir(album_path) if f.lower().endswith(('.mp3', '.flac'))])
-                        library[artist].append({'name': album, 'track_count': count})
+        for artist_entry in artists:
+            albums = library[artist_entry.name] = []
+            with os.scandir(artist_entry.path) as artist_it:
+                for album_entry in artist_it:
+                    # Dot-dirs are pending deletes, not albums
+                    if not album_entry.is_dir() or album_entry.name.startswith('.'): continue
+                    with os.scandir(album_entry.path) as album_it:
+                        count = sum(1 for f in album_it
+                                    if f.name.lower().endswith(_AUDIO_EXTS) and f.is_file())
+                    albums.append({'name': album_entry.name, 'track_count': count})
         return library
 
 
 # Initialize
 downloader = MusicDownloader()
+_start_library_watcher()
+_reap_trash()
 
 
 # === Routes ===
@@ -440,32 +1350,32 @@ def download_album():
     browse_id = data.get('browseId')
     quality = data.get('quality', 'flac')
     if not query: return jsonify({'error': 'Query required'}), 400
-    download_id = str(len(download_status) + 1)
-    with download_lock:
-        download_status[download_id] = {'status': 'searching', 'message': 'Searching...', 'type': 'album'}
+    if request.args.get('refresh') == '1':
+        _cached_get_album.cache_clear()
+    download_id = register_download('searching', 'Searching...', 'album')
     def task():
+        # Resolve every entry first so yt-dlp can fetch them all in one run; an
+        # entry that can't be resolved is reported without cancelling the rest
+        albums, failed = [], []
         entries = [e.strip() for e in query.split(',')]
         for entry in entries:
-            if '-' not in entry:
-                with download_lock:
-                    download_status[download_id]['status'] = 'error'
-                    download_status[download_id]['message'] = f'Invalid format: {entry}'
-                return
-            artist, album = [x.strip() for x in entry.split('-', 1)]
-            with download_lock:
-                download_status[download_id]['message'] = f'Searching {artist} - {album}...'
-            album_info = downloader.search_album(f"{artist} {album}") if not browse_id else {
-                'browseId': browse_id,
-                'thumbnails': []
-            }
-            if album_info:
-                downloader.download_album(album_info, MUSIC_DIR, artist, album, download_id, quality)
+            artist, sep, album = entry.partition('-')
+            if not sep:
+                failed.append((entry, 'Invalid format'))
+                continue
+            artist, album = artist.strip(), album.strip()
+            update_status(download_id, message=f'Searching {artist} - {album}...')
+            # A known browseId needs no search; get_album supplies the thumbnails
+            if browse_id:
+                album_info = {'browseId': browse_id}
             else:
-                with download_lock:
-                    download_status[download_id]['status'] = 'error'
-                    download_status[download_id]['message'] = f'Not found: {artist} - {album}'
-                return
-    threading.Thread(target=task).start()
+                album_info = downloader.search_album(f"{artist} {album}")
+            if not album_info:
+                failed.append((f"{artist} - {album}", 'Not found'))
+                continue
+            albums.append((album_info, artist, album))
+        downloader.download_albums(albums, MUSIC_DIR, download_id, quality, failed)
+    submit_download(download_id, task)
     return jsonify({'download_id': download_id})
 
 @app.route('/download-song', methods=['POST'])
@@ -474,10 +1384,8 @@ def download_song():
     url = data.get('url', '').strip()
     quality = data.get('quality', 'flac')
     if not url: return jsonify({'error': 'URL required'}), 400
-    download_id = str(len(download_status) + 1)
-    with download_lock:
-        download_status[download_id] = {'status': 'starting', 'message': 'Starting...', 'type': 'song'}
-    threading.Thread(target=lambda: downloader.download_song(url, download_id, quality)).start()
+    download_id = register_download('starting', 'Starting...', 'song')
+    submit_download(download_id, lambda: downloader.download_song(url, download_id, quality))
     return jsonify({'download_id': download_id})
 
 @app.route('/download-track', methods=['POST'])
@@ -487,10 +1395,8 @@ def download_track():
     title = data.get('title', '').strip()
     quality = data.get('quality', 'flac')
     if not artist or not title: return jsonify({'error': 'Artist and title required'}), 400
-    download_id = str(len(download_status) + 1)
-    with download_lock:
-        download_status[download_id] = {'status': 'starting', 'message': f'Downloading {artist} - {title}...', 'type': 'track'}
-    threading.Thread(target=lambda: downloader.download_artist_song(artist, title, download_id, quality)).start()
+    download_id = register_download('starting', f'Downloading {artist} - {title}...', 'track')
+    submit_download(download_id, lambda: downloader.download_artist_song(artist, title, download_id, quality))
     return jsonify({'download_id': download_id})
 
 @app.route('/delete-artist', methods=['POST'])
@@ -512,12 +1418,37 @@ def delete_album():
 
 @app.route('/download-status/<download_id>')
 def get_download_status(download_id):
-    with download_lock:
-        return jsonify(download_status.get(download_id, {'status': 'not_found'}))
+    entry = download_status.get(download_id)
+    if entry is None:
+        return jsonify({'status': 'not_found'})
+    payload = asdict(entry)
+    future = _download_futures.get(download_id)
+    if future is not None and not future.running() and not future.done():
+        payload['status'] = 'queued'
+        payload['message'] = 'Waiting for a free download slot...'
+    return _json_response(payload)
 
 @app.route('/library')
 def get_library():
-    return jsonify(downloader.get_library_structure())
+    library, etag, modified = downloader.get_library_snapshot()
+    # Weak validator: the hash covers the library content, not the exact response bytes.
+    # If-None-Match takes precedence; If-Modified-Since serves clients without ETags.
+    if request.if_none_match:
+        not_modified = bool(etag) and request.if_none_match.contains_weak(etag)
+    else:
+        since = request.if_modified_since
+        not_modified = bool(modified) and since is not None and modified <= since.timestamp()
+    if not_modified:
+        resp = app.response_class(status=304)
+    else:
+        resp = _json_response(library)
+    if etag:
+        resp.set_etag(etag, weak=True)
+    if modified:
+        resp.last_modified = modified
+    # Always revalidate (cheap 304) so deletes/downloads show up immediately
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
 
 if __name__ == '__main__':
     os.makedirs(MUSIC_DIR, exist_ok=True)
@@ -2,13 +2,15 @@
 import os
 import json
 import re
+import bisect
 import subprocess
 import requests
 import threading
+from concurrent.futures import ThreadPoolExecutor
 from flask import Flask, render_template, request, jsonify
 from ytmusicapi import YTMusic
 from mutagen.easyid3 import EasyID3
-from mutagen.id3 import ID3, APIC, ID3NoHeaderError
+from mutagen.id3 import APIC, ID3NoHeaderError
 from mutagen.flac import FLAC, Picture
 import shutil
 from urllib.parse import urlparse, parse_qs
@@ -34,6 +36,15 @@ COOKIES_FILE = "cookies.txt"
 os.makedirs(MUSIC_DIR, exist_ok=True)
 os.makedirs(CONFIG_DIR, exist_ok=True)
 
+# Precompiled patterns for filename/title cleanup
+_SANITIZE_RE = re.compile(r'[\\/*?:"<>|]')
+_NORMALIZE_RE = re.compile(r'\W+')
+_LEAD_NUM_RE = re.compile(r"^\d+\s*[-.]?\s*")
+# (feat. ...), (Explicit)/[Explicit] and any other [...] tag, removed in one scan
+_CLEAN_RE = re.compile(r"\s*\(feat\..*?\)|\s*[\(\[]Explicit[\)\]]|\s*\[.*?\]", re.IGNORECASE)
+_PARENS_RE = re.compile(r'\([^)]*\)')
+_THUMB_SIZE_RE = re.compile(r'=w\d+-h\d+')
+
 # Set proper permissions for Navidrome
 def set_file_permissions(path):
     """Set proper permissions for music files."""
@@ -54,6 +65,30 @@ def set_file_permissions(path):
 download_status = {}
 download_lock = threading.Lock()
 
+# Bounded worker pool so bursts of requests don't spawn unlimited yt-dlp processes
+DOWNLOAD_POOL = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('MAX_CONCURRENT_DOWNLOADS', '4')),
+    thread_name_prefix='dl'
+)
+
+def _run_quiet(cmd, input=None, timeout=None, **kw):
+    """Run cmd discarding stdout, so only stderr is buffered for error reporting."""
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        **kw
+    )
+    try:
+        _, err = proc.communicate(input=input, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.communicate()
+        raise
+    return subprocess.CompletedProcess(cmd, proc.returncode, None, err)
+
 def run_download_with_fallback(output_template, url, cookies=True, quality='flac'):
     """Download audio with user-selected quality."""
     cmd = [
@@ -72,7 +107,7 @@ def run_download_with_fallback(output_template, url, cookies=True, quality='flac
     fmt = "flac" if quality == "flac" else "mp3"
     cmd += ["--audio-format", fmt, "--audio-quality", "0"]
 
-    result = subprocess.run(cmd, capture_output=True, text=True)
+    result = _run_quiet(cmd)
     if result.returncode == 0:
         print(f"Successfully downloaded in {fmt.upper()}")
     else:
@@ -80,6 +115,39 @@ def run_download_with_fallback(output_template, url, cookies=True, quality='flac
     return result
 
 
+# Expose the front cover as an EasyID3 key, so art and text tags go out in one save
+def _cover_get(id3, key):
+    return [p.data for p in id3.getall("APIC")]
+
+
+def _cover_set(id3, key, value):
+    id3.delall("APIC")  # Remove existing art
+    id3.add(APIC(
+        encoding=3,
+        mime="image/jpeg",
+        type=3,  # Cover (front)
+        desc="Cover",
+        data=value[0]
+    ))
+
+
+def _cover_delete(id3, key):
+    id3.delall("APIC")
+
+
+EasyID3.RegisterKey("cover", _cover_get, _cover_set, _cover_delete)
+
+
+def _set_flac_cover(audio, img_data):
+    audio.clear_pictures()  # Remove existing art
+    pic = Picture()
+    pic.type = 3  # Cover (front)
+    pic.mime = "image/jpeg"
+    pic.desc = "Cover"
+    pic.data = img_data
+    audio.add_picture(pic)
+
+
 class MusicDownloader:
     def __init__(self):
         try:
@@ -93,11 +161,11 @@ class MusicDownloader:
                 self.ytmusic = None
 
     def sanitize_filename(self, name):
-        return re.sub(r'[\\/*?:"<>|]', '', name)
+        return _SANITIZE_RE.sub('', name)
 
     def normalize_title(self, title):
         """Normalize title for matching - remove all non-alphanumeric chars and lowercase"""
-        return re.sub(r'\W+', '', title).lower()
+        return _NORMALIZE_RE.sub('', title).lower()
 
     def search_albums(self, query):
         if not self.ytmusic or not query:
@@ -137,7 +205,7 @@ class MusicDownloader:
         # Sometimes the URL needs modification for max quality
         url = best["url"]
         if "maxresdefault" not in url:
-            url = re.sub(r'=w\d+-h\d+', '=w1200-h1200', url)
+            url = _THUMB_SIZE_RE.sub('=w1200-h1200', url)
             
         try:
             r = requests.get(url, timeout=30)
@@ -147,59 +215,20 @@ class MusicDownloader:
             print(f"Album art download failed: {e}")
             return None
 
-    def embed_album_art(self, folder, img_data):
-        """Embed album art into all audio files in folder"""
-        if not img_data:
-            return
-            
-        # Save cover.jpg for reference
+    def save_cover(self, folder, img_data):
+        """Save cover.jpg for reference; embedding happens in fix_track_metadata"""
         cover_path = os.path.join(folder, "cover.jpg")
         with open(cover_path, "wb") as f:
             f.write(img_data)
 
-        for file in os.listdir(folder):
-            path = os.path.join(folder, file)
-            if file.lower().endswith(".mp3"):
-                try:
-                    audio = ID3(path)
-                    audio.delall("APIC")  # Remove existing art
-                    audio.add(APIC(
-                        encoding=3,
-                        mime="image/jpeg",
-                        type=3,  # Cover (front)
-                        desc="Cover",
-                        data=img_data
-                    ))
-                    audio.save(v2_version=3)
-                    print(f"✅ Embedded art in: {file}")
-                except Exception as e:
-                    print(f"MP3 art embed failed for {file}: {e}")
-            elif file.lower().endswith(".flac"):
-                try:
-                    audio = FLAC(path)
-                    audio.clear_pictures()  # Remove existing art
-                    pic = Picture()
-                    pic.type = 3  # Cover (front)
-                    pic.mime = "image/jpeg"
-                    pic.desc = "Cover"
-                    pic.data = img_data
-                    audio.add_picture(pic)
-                    audio.save()
-                    print(f"✅ Embedded art in: {file}")
-                except Exception as e:
-                    print(f"FLAC art embed failed for {file}: {e}")
-
     def clean_title(self, title):
         """Clean up track titles"""
-        cleaned = re.sub(r"^\d+\s*[-.]?\s*", "", title)  # Remove leading track numbers
-        cleaned = re.sub(r"\s*\(feat\..*?\)", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*\(Explicit\)", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*\[Explicit\]", "", cleaned, flags=re.IGNORECASE)
-        cleaned = re.sub(r"\s*\[.*?\]", "", cleaned)
+        cleaned = _LEAD_NUM_RE.sub("", title)  # Remove leading track numbers
+        cleaned = _CLEAN_RE.sub("", cleaned)
         return cleaned.strip()
 
-    def fix_track_metadata(self, folder, albumartist, album_title, album_data):
-        """Fix track numbers and clean titles using YTMusic track order."""
+    def fix_track_metadata(self, folder, albumartist, album_title, album_data, img_data=None):
+        """Fix track numbers, clean titles and embed cover art, saving each file once."""
         print(f"🎯 Fixing track metadata for: {albumartist} - {album_title}")
         
         # Build track order map from YTMusic data
@@ -214,71 +243,88 @@ class MusicDownloader:
                 track_order[self.normalize_title(clean_title)] = idx
                 
                 # Also try without parentheses content
-                no_parens = re.sub(r'\([^)]*\)', '', raw_title).strip()
+                no_parens = _PARENS_RE.sub('', raw_title).strip()
                 track_order[self.normalize_title(no_parens)] = idx
 
-        files = [f for f in os.listdir(folder) if f.lower().endswith((".mp3", ".flac"))]
-        
-        for file in files:
-            path = os.path.join(folder, file)
-            try:
-                if file.lower().endswith(".mp3"):
-                    try:
-                        audio = EasyID3(path)
-                    except ID3NoHeaderError:
-                        audio = EasyID3()
-                        audio.save(path)
-                        audio = EasyID3(path)
-                elif file.lower().endswith(".flac"):
-                    audio = FLAC(path)
-                else:
-                    continue
+        # Sorted once so prefix matches are a binary search, not a scan
+        sorted_keys = sorted(track_order)
 
-                # Get current title
-                title = audio.get("title", [os.path.splitext(file)[0]])[0]
-                if isinstance(title, list):
-                    title = title[0]
-                    
-                cleaned_title = self.clean_title(title)
+        files = [f for f in os.listdir(folder) if f.lower().endswith((".mp3", ".flac"))]
+        if not files:
+            return
 
-                # Update metadata
-                audio["albumartist"] = albumartist
-                audio["artist"] = albumartist  # Also set artist
-                audio["album"] = album_title
-                audio["title"] = cleaned_title
+        # Files are independent and I/O-bound, so tag them concurrently
+        with ThreadPoolExecutor(max_workers=min(8, len(files))) as ex:
+            list(ex.map(
+                lambda file: self._fix_one(folder, file, albumartist, album_title,
+                                           track_order, sorted_keys, img_data),
+                files
+            ))
+
+    def _fix_one(self, folder, file, albumartist, album_title, track_order, sorted_keys, img_data):
+        """Apply cleaned tags, track number and cover to one file in a single save."""
+        path = os.path.join(folder, file)
+        try:
+            if file.lower().endswith(".mp3"):
+                try:
+                    audio = EasyID3(path)
+                except ID3NoHeaderError:
+                    audio = EasyID3()
+                    audio.save(path)
+                    audio = EasyID3(path)
+            else:
+                audio = FLAC(path)
 
-                # Try multiple matching strategies for track number
-                track_num = None
+            # Get current title
+            title = audio.get("title", [os.path.splitext(file)[0]])[0]
+            if isinstance(title, list):
+                title = title[0]
                 
-                # Try exact cleaned match
-                norm_cleaned = self.normalize_title(cleaned_title)
-                track_num = track_order.get(norm_cleaned)
-                
-                # Try original title match
-                if not track_num:
-                    norm_orig = self.normalize_title(title)
-                    track_num = track_order.get(norm_orig)
-                
-                # Try partial matching (first few words)
-                if not track_num:
-                    words = cleaned_title.split()[:3]
-                    if words:
-                        partial = self.normalize_title(' '.join(words))
-                        for key, num in track_order.items():
-                            if key.startswith(partial):
-                                track_num = num
-                                break
-
-                if track_num:
-                    audio["tracknumber"] = str(track_num)
-                    print(f"✅ Track {track_num}: {cleaned_title}")
+            cleaned_title = self.clean_title(title)
+
+            # Update metadata
+            audio["albumartist"] = albumartist
+            audio["artist"] = albumartist  # Also set artist
+            audio["album"] = album_title
+            audio["title"] = cleaned_title
+
+            # Try multiple matching strategies for track number
+            track_num = None
+            
+            # Try exact cleaned match
+            norm_cleaned = self.normalize_title(cleaned_title)
+            track_num = track_order.get(norm_cleaned)
+            
+            # Try original title match
+            if not track_num:
+                norm_orig = self.normalize_title(title)
+                track_num = track_order.get(norm_orig)
+            
+            # Try partial matching (first few words)
+            if not track_num:
+                words = cleaned_title.split()[:3]
+                if words:
+                    partial = self.normalize_title(' '.join(words))
+                    i = bisect.bisect_left(sorted_keys, partial)
+                    if i < len(sorted_keys) and sorted_keys[i].startswith(partial):
+                        track_num = track_order[sorted_keys[i]]
+
+            if track_num:
+                audio["tracknumber"] = str(track_num)
+                print(f"✅ Track {track_num}: {cleaned_title}")
+            else:
+                print(f"⚠️ No track number match for: {cleaned_title}")
+
+            if img_data:
+                if file.lower().endswith(".mp3"):
+                    audio["cover"] = [img_data]
                 else:
-                    print(f"⚠️ No track number match for: {cleaned_title}")
+                    _set_flac_cover(audio, img_data)
 
-                audio.save()
-                
-            except Exception as e:
-                print(f"❌ Failed to update {file}: {e}")
+            audio.save()
+            
+        except Exception as e:
+            print(f"❌ Failed to update {file}: {e}")
 
     def run_beets_on_album(self, album_folder, artist_name, album_name):
         """Run beets with autotagging to fix metadata and organize"""
@@ -304,11 +350,9 @@ class MusicDownloader:
 
         try:
             # Run beets and auto-accept the best match
-            result = subprocess.run(
+            result = _run_quiet(
                 cmd,
                 env=env,
-                capture_output=True,
-                text=True,
                 timeout=600,
                 input="A\n"  # Auto-accept the first match
             )
@@ -328,11 +372,9 @@ class MusicDownloader:
                     album_folder
                 ]
                 
-                result_fallback = subprocess.run(
+                result_fallback = _run_quiet(
                     cmd_fallback,
                     env=env,
-                    capture_output=True,
-                    text=True,
                     timeout=600,
                     input="\n"
                 )
@@ -406,15 +448,15 @@ class MusicDownloader:
             
             img_data = self.get_high_quality_album_art(album_data)
             if img_data:
-                self.embed_album_art(album_folder, img_data)
+                self.save_cover(album_folder, img_data)
             else:
                 print("⚠️ Could not fetch album art")
 
-            # Step 2: Fix track metadata (numbers, titles, artist, album)
+            # Step 2: Fix track metadata (numbers, titles, artist, album) and embed the art
             with download_lock:
                 download_status[download_id]['message'] = 'Fixing track metadata and order...'
             
-            self.fix_track_metadata(album_folder, artist_name, album_name, album_data)
+            self.fix_track_metadata(album_folder, artist_name, album_name, album_data, img_data)
 
             # Step 3: Run Beets to organize and further fix metadata
             with download_lock:
@@ -571,7 +613,7 @@ def download_album():
     if not query:
         return jsonify({'error': 'Query required'}), 400
         
-    download_id = str(len(download_status) + 1)
+    download_id = secrets.token_urlsafe(8)
     with download_lock:
         download_status[download_id] = {'status': 'searching', 'message': 'Searching...', 'type': 'album'}
     
@@ -611,7 +653,7 @@ def download_album():
                     download_status[download_id]['message'] = f'Not found: {artist} - {album}'
                 return
                 
-    threading.Thread(target=task).start()
+    DOWNLOAD_POOL.submit(task)
     return jsonify({'download_id': download_id})
 
 @app.route('/download-song', methods=['POST'])
@@ -623,11 +665,11 @@ def download_song():
     if not url:
         return jsonify({'error': 'URL required'}), 400
         
-    download_id = str(len(download_status) + 1)
+    download_id = secrets.token_urlsafe(8)
     with download_lock:
         download_status[download_id] = {'status': 'starting', 'message': 'Starting...', 'type': 'song'}
         
-    threading.Thread(target=lambda: downloader.download_song(url, download_id, quality)).start()
+    DOWNLOAD_POOL.submit(downloader.download_song, url, download_id, quality)
     return jsonify({'download_id': download_id})
 
 @app.route('/download-track', methods=['POST'])
@@ -640,11 +682,11 @@ def download_track():
     if not artist or not title:
         return jsonify({'error': 'Artist and title required'}), 400
         
-    download_id = str(len(download_status) + 1)
+    download_id = secrets.token_urlsafe(8)
     with download_lock:
         download_status[download_id] = {'status': 'starting', 'message': f'Downloading {artist} - {title}...', 'type': 'track'}
         
-    threading.Thread(target=lambda: downloader.download_artist_song(artist, title, download_id, quality)).start()
+    DOWNLOAD_POOL.submit(downloader.download_artist_song, artist, title, download_id, quality)
     return jsonify({'download_id': download_id})
 
 @app.route('/delete-artist', methods=['POST'])